@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Tuple
+
+
+class AdjudicatorAgent:
+    """Fused World Authority + Rules pass: plausibility, world effects and mechanics in one call."""
+
+    def __init__(self, llm_callable, prompt_text: str) -> None:
+        self.llm = llm_callable
+        self.prompt_text = prompt_text
+
+    def adjudicate(
+        self,
+        player_action: str,
+        observable_context: Dict[str, Any],
+        hidden_world_context: Dict[str, Any],
+        scenario_context: Dict[str, Any],
+        rules_context: Dict[str, Any],
+        d20_roll: int,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Return (world_result, rules_result) with the same shapes as the separate agents."""
+        payload = {
+            "player_action": player_action,
+            "d20_roll": d20_roll,
+            "observable_context": observable_context,
+            "hidden_world_context": hidden_world_context,
+            "scenario_context": scenario_context,
+            "rules_context": rules_context,
+            "required_output": {
+                "plausible": "bool",
+                "reason": "str",
+                "world_effects": {
+                    "location_change": "str|null",
+                    "npc_updates": "list[dict]",
+                    "flag_updates": "dict[str,bool]",
+                },
+                "outcome": "success|partial_success|failure",
+                "difficulty": "int",
+                "mechanical_effects": {
+                    "hp_delta": "int",
+                    "xp_delta": "int",
+                    "inventory_changes": "list[str]",
+                    "new_flags": "dict[str,bool]",
+                },
+                "reasoning": "short rules-focused explanation",
+                "confidence": "float 0-1, how sure you are of this answer",
+            },
+        }
+
+        raw = self.llm(self.prompt_text, json.dumps(payload, ensure_ascii=False, indent=2))
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
+            return (
+                {
+                    "plausible": False,
+                    "reason": "Adjudication output was invalid JSON.",
+                    "world_effects": {
+                        "location_change": None,
+                        "npc_updates": [],
+                        "flag_updates": {},
+                    },
+                },
+                {
+                    "outcome": "failure",
+                    "difficulty": 12,
+                    "d20_roll": d20_roll,
+                    "mechanical_effects": {
+                        "hp_delta": 0,
+                        "xp_delta": 0,
+                        "inventory_changes": [],
+                        "new_flags": {},
+                    },
+                    "reasoning": "Adjudication output was invalid JSON. Defaulting to safe failure.",
+                },
+            )
+
+        world_effects = dict(data.get("world_effects") or {})
+        world_effects.setdefault("location_change", None)
+        world_effects.setdefault("npc_updates", [])
+        world_effects.setdefault("flag_updates", {})
+        world_result = {
+            "plausible": data.get("plausible", False),
+            "reason": data.get("reason", "No reason provided."),
+            "world_effects": world_effects,
+        }
+
+        mechanical_effects = dict(data.get("mechanical_effects") or {})
+        mechanical_effects.setdefault("hp_delta", 0)
+        mechanical_effects.setdefault("xp_delta", 0)
+        mechanical_effects.setdefault("inventory_changes", [])
+        mechanical_effects.setdefault("new_flags", {})
+        rules_result = {
+            "outcome": data.get("outcome", "failure"),
+            "difficulty": data.get("difficulty", 12),
+            "mechanical_effects": mechanical_effects,
+            "reasoning": data.get("reasoning", ""),
+            "d20_roll": d20_roll,
+        }
+        return world_result, rules_result
@@ -36,6 +36,7 @@ class GuardAgent:
                 "block_category": "impossible|metagaming|none",
                 "reason": "str",
                 "risk_level": "low|medium|high",
+                "confidence": "float 0-1, how sure you are of this answer",
             },
         }
 
@@ -1,9 +1,17 @@
 from __future__ import annotations
 
 import json
+import os
+import threading
+from contextlib import contextmanager
 from copy import deepcopy
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, writes are still atomic.
+    fcntl = None
 
 
 class MemoryAgent:
@@ -12,22 +20,70 @@ class MemoryAgent:
     def __init__(self, path: str | Path) -> None:
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Shared by every process using this memory directory (CLI, web workers, import, reset).
+        self.lock_path = self.path.with_name(f"{self.path.name}.lock")
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """
+        Exclusive advisory lock on the state file, re-entrant within one thread.
+        Readers do not need it: saves replace the file atomically.
+        """
+        with self._thread_lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+
+            with self.lock_path.open("a+") as handle:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                self._lock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth = 0
+                    if fcntl is not None:
+                        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    @contextmanager
+    def transaction(self) -> Iterator[Dict[str, Any]]:
+        """Load the latest state under the lock and save it when the block exits without error."""
+        with self.lock():
+            state = self.load()
+            yield state
+            self.save(state)
 
     def load(self) -> Dict[str, Any]:
         if not self.path.exists():
-            template = self.path.with_name("game_state.template.json")
-            if template.exists():
-                with template.open("r", encoding="utf-8") as f:
-                    state = json.load(f)
-                self.save(state)
-                return state
-            raise FileNotFoundError(f"Game state file not found: {self.path}")
+            with self.lock():
+                if not self.path.exists():
+                    template = self.path.with_name("game_state.template.json")
+                    if template.exists():
+                        with template.open("r", encoding="utf-8") as f:
+                            state = json.load(f)
+                        self.save(state)
+                        return state
+                    raise FileNotFoundError(f"Game state file not found: {self.path}")
         with self.path.open("r", encoding="utf-8") as f:
             return json.load(f)
 
     def save(self, state: Dict[str, Any]) -> None:
-        with self.path.open("w", encoding="utf-8") as f:
-            json.dump(state, f, indent=2, ensure_ascii=False)
+        with self.lock():
+            tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            try:
+                with tmp_path.open("w", encoding="utf-8") as f:
+                    json.dump(state, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
 
     def reset_from_template(self, template_path: str | Path) -> Dict[str, Any]:
         template = Path(template_path)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Optional
 
 
 class NarratorAgent:
@@ -17,6 +17,7 @@ class NarratorAgent:
         player_action: str,
         guard_result: Dict[str, Any],
         rules_result: Dict[str, Any],
+        on_token: Optional[Callable[[str], None]] = None,
     ) -> str:
         payload = {
             "observable_context": observable_context,
@@ -29,4 +30,7 @@ class NarratorAgent:
                 "Include immediate sensory details and next possible choices.",
             ],
         }
-        return self.llm(self.prompt_text, json.dumps(payload, ensure_ascii=False, indent=2)).strip()
+        prompt = json.dumps(payload, ensure_ascii=False, indent=2)
+        if on_token is not None:
+            return self.llm(self.prompt_text, prompt, on_token=on_token).strip()
+        return self.llm(self.prompt_text, prompt).strip()
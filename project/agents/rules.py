@@ -36,6 +36,7 @@ class RulesAgent:
                     "new_flags": "dict[str,bool]",
                 },
                 "reasoning": "short rules-focused explanation",
+                "confidence": "float 0-1, how sure you are of this answer",
             },
         }
 
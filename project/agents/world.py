@@ -33,6 +33,7 @@ class WorldAuthorityAgent:
                     "npc_updates": "list[dict]",
                     "flag_updates": "dict[str,bool]",
                 },
+                "confidence": "float 0-1, how sure you are of this answer",
             },
         }
 
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import json
+import queue
+import threading
+from typing import Any, Dict, List
+
+SUBSCRIBER_BUFFER = 512
+_MISSING = object()
+
+
+def encode_event(event: str, data: Dict[str, Any], event_id: int | None = None) -> bytes:
+    """Serialize one Server-Sent Events frame."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def _list_delta(before: List[Any], after: List[Any]) -> Any:
+    """Encode a list that only dropped items at the front and gained items at the end (e.g. the log window)."""
+    for shift in range(len(before) + 1):
+        kept = before[shift:]
+        if after[: len(kept)] == kept:
+            appended = after[len(kept):]
+            if shift == 0 and not appended:
+                return _MISSING
+            if kept:
+                return {"$shift": shift, "$append": appended}
+            break
+    return after
+
+
+def observable_delta(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return a JSON merge patch (RFC 7386) turning `before` into `after`.
+    Lists that slide forward are sent as {"$shift": n, "$append": [...]} instead of being repeated.
+    """
+    delta: Dict[str, Any] = {}
+    for key in before.keys() - after.keys():
+        delta[key] = None
+    for key, value in after.items():
+        old = before.get(key, _MISSING)
+        if old == value:
+            continue
+        if isinstance(old, dict) and isinstance(value, dict):
+            delta[key] = observable_delta(old, value)
+        elif isinstance(old, list) and isinstance(value, list):
+            patch = _list_delta(old, value)
+            if patch is not _MISSING:
+                delta[key] = patch
+        else:
+            delta[key] = value
+    return delta
+
+
+class Subscriber:
+    """One read-only event stream; frames are shared bytes, never re-serialized per client."""
+
+    def __init__(self) -> None:
+        self.frames: "queue.Queue[bytes]" = queue.Queue(maxsize=SUBSCRIBER_BUFFER)
+        self.closed = False
+
+    def next_frame(self, timeout: float) -> bytes | None:
+        try:
+            return self.frames.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventHub:
+    """Fans out turn events from one producer to every subscriber of a session."""
+
+    def __init__(self) -> None:
+        self._subscribers: Dict[str, List[Subscriber]] = {}
+        self._next_id: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, session: str) -> Subscriber:
+        subscriber = Subscriber()
+        with self._lock:
+            self._subscribers.setdefault(session, []).append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, session: str, subscriber: Subscriber) -> None:
+        subscriber.closed = True
+        with self._lock:
+            subscribers = self._subscribers.get(session, [])
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+            if not subscribers:
+                self._subscribers.pop(session, None)
+
+    def subscriber_count(self, session: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(session, []))
+
+    def publish(self, session: str, event: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(session, []))
+            if not subscribers:
+                return
+            event_id = self._next_id.get(session, 0) + 1
+            self._next_id[session] = event_id
+
+        frame = encode_event(event, data, event_id)
+        for subscriber in subscribers:
+            try:
+                subscriber.frames.put_nowait(frame)
+            except queue.Full:
+                # A spectator that cannot keep up is dropped rather than slowing the turn down.
+                self.unsubscribe(session, subscriber)
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import argparse
-import json
 import subprocess
 from pathlib import Path
 from typing import Any, Dict
 
+from agents.memory import MemoryAgent
+
 
 def _extract_text_from_pdf(pdf_path: Path) -> str:
     """
@@ -59,20 +60,19 @@ def import_content(project_root: Path, source: Path, content_type: str, title: s
     target_txt = library_dir / f"{doc_name}.txt"
     target_txt.write_text(text, encoding="utf-8")
 
-    state: Dict[str, Any] = json.loads(state_path.read_text(encoding="utf-8"))
     key = "rules" if content_type == "rules" else "scenario"
-    section = state.setdefault(key, {})
-    section["source_documents"] = section.get("source_documents", [])
-    section["source_documents"].append(
-        {
-            "title": title or doc_name,
-            "source": str(source),
-            "cached_text": str(target_txt),
-        }
-    )
-    section["active_summary"] = _build_summary(text)
-
-    state_path.write_text(json.dumps(state, indent=2, ensure_ascii=False), encoding="utf-8")
+    # Locked read-modify-write: the web server or CLI may be saving a turn at the same time.
+    with MemoryAgent(state_path).transaction() as state:
+        section: Dict[str, Any] = state.setdefault(key, {})
+        section["source_documents"] = section.get("source_documents", [])
+        section["source_documents"].append(
+            {
+                "title": title or doc_name,
+                "source": str(source),
+                "cached_text": str(target_txt),
+            }
+        )
+        section["active_summary"] = _build_summary(text)
     return target_txt
 
 
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Lower value is served first. Interactive turns (guard, world, rules, narrator) beat background work.
+PRIORITIES = {"interactive": 0, "background": 1}
+
+
+class SchedulerSaturated(RuntimeError):
+    """Raised when the LLM queue is full or a request waited too long for a model slot."""
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Lane:
+    """Per-model bookkeeping: running calls, waiters ordered by (priority, arrival)."""
+
+    in_flight: int = 0
+    waiting: List[Tuple[int, int]] = field(default_factory=list)
+    avg_seconds: float = 10.0
+
+
+class LLMScheduler:
+    """
+    Admission control in front of the local Ollama instance.
+    Each model runs at most `max_in_flight` generations; extra calls wait in a priority queue
+    bounded by `max_queue` (background work may only use half of it).
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 2,
+        max_queue: int = 8,
+        queue_timeout: float = 60.0,
+        per_model_limits: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.per_model_limits = dict(per_model_limits or {})
+        self._lanes: Dict[str, _Lane] = {}
+        self._arrivals = itertools.count()
+        self._cond = threading.Condition()
+
+    def split(self, parts: int) -> None:
+        """Keep 1/parts of every limit, for when `parts` processes each run a scheduler against one Ollama."""
+        with self._cond:
+            self.max_in_flight = max(1, self.max_in_flight // parts)
+            self.max_queue = max(1, self.max_queue // parts)
+            self.per_model_limits = {model: max(1, limit // parts) for model, limit in self.per_model_limits.items()}
+
+    def _limit(self, model: str) -> int:
+        return max(1, self.per_model_limits.get(model, self.max_in_flight))
+
+    def _lane(self, model: str) -> _Lane:
+        return self._lanes.setdefault(model, _Lane())
+
+    def _queued(self) -> int:
+        return sum(len(lane.waiting) for lane in self._lanes.values())
+
+    def _queue_cap(self, priority: int) -> int:
+        return self.max_queue if priority == PRIORITIES["interactive"] else max(1, self.max_queue // 2)
+
+    def retry_after(self, model: Optional[str] = None) -> int:
+        """Seconds a rejected client should wait, estimated from queue depth and recent service time."""
+        with self._cond:
+            names = [model] if model in self._lanes else list(self._lanes)
+            worst = max(
+                (
+                    self._lanes[name].avg_seconds
+                    * (len(self._lanes[name].waiting) + self._lanes[name].in_flight)
+                    / self._limit(name)
+                    for name in names
+                ),
+                default=1.0,
+            )
+        return max(1, math.ceil(worst))
+
+    def check_admission(self, priority: str = "interactive") -> None:
+        """Fail fast instead of queueing new work behind a full queue."""
+        level = PRIORITIES[priority]
+        with self._cond:
+            saturated = self._queued() >= self._queue_cap(level)
+        if saturated:
+            raise SchedulerSaturated("LLM queue is full.", self.retry_after())
+
+    def run(
+        self,
+        model: str,
+        fn: Callable[[], T],
+        priority: str = "interactive",
+        timeout: Optional[float] = None,
+    ) -> T:
+        """Run `fn` once a slot for `model` is free, honouring priority order."""
+        level = PRIORITIES[priority]
+        ticket = (level, next(self._arrivals))
+        deadline = time.monotonic() + (self.queue_timeout if timeout is None else timeout)
+
+        with self._cond:
+            lane = self._lane(model)
+            if self._queued() >= self._queue_cap(level):
+                raise SchedulerSaturated("LLM queue is full.", self.retry_after(model))
+            heapq.heappush(lane.waiting, ticket)
+            try:
+                while lane.in_flight >= self._limit(model) or lane.waiting[0] != ticket:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise SchedulerSaturated(
+                            f"Timed out waiting for model {model}.", self.retry_after(model)
+                        )
+                    self._cond.wait(remaining)
+            except BaseException:
+                lane.waiting.remove(ticket)
+                heapq.heapify(lane.waiting)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(lane.waiting)
+            lane.in_flight += 1
+
+        started = time.monotonic()
+        try:
+            return fn()
+        finally:
+            elapsed = time.monotonic() - started
+            with self._cond:
+                lane.in_flight -= 1
+                lane.avg_seconds = 0.8 * lane.avg_seconds + 0.2 * elapsed
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                model: {
+                    "in_flight": lane.in_flight,
+                    "queued": len(lane.waiting),
+                    "limit": self._limit(model),
+                    "avg_seconds": round(lane.avg_seconds, 2),
+                }
+                for model, lane in self._lanes.items()
+            }
@@ -1,32 +1,116 @@
 from __future__ import annotations
 
+import http.client
 import json
+import threading
+import time
 import urllib.error
 import urllib.request
 from pathlib import Path
-from typing import Any, Dict
+from random import randint
+from typing import Any, Callable, Dict, Optional
 
+from agents.adjudicator import AdjudicatorAgent
 from agents.guard import GuardAgent
 from agents.memory import MemoryAgent
 from agents.narrator import NarratorAgent
 from agents.rules import RulesAgent
 from agents.world import WorldAuthorityAgent
+from events import observable_delta
+from llm_scheduler import LLMScheduler, SchedulerSaturated
+from model_router import ModelRouter, RoutedLLM
+from resilience import CircuitBreaker, CircuitOpenError, Deadline, current_deadline, use_deadline
+from save_slots import SaveSlotStore
 
 OLLAMA_URL = "http://localhost:11434/api/generate"
 DEFAULT_MODEL = "llama3.1:8b"
+# Cheaper tier for simple turns; invalid answers are retried on DEFAULT_MODEL.
+# Routing is off while this equals DEFAULT_MODEL; pull e.g. "llama3.2:3b" and set it here to enable.
+SMALL_MODEL = DEFAULT_MODEL
+# One LLM call for world plausibility + rules instead of two (see agents/adjudicator.py).
+FUSED_ADJUDICATION = False
+# How long Ollama keeps a model resident after the last call (avoids cold reloads between turns).
+KEEP_ALIVE = "30m"
+# The current save slot is refreshed every N logged turns, vetoes included (0 disables autosave).
+AUTOSAVE_EVERY_TURNS = 5
 RESET_ALIASES = {"reset", "/reset", "réinitialiser", "reinitialiser", "reste"}
 
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+# Called with the model name after each successful generation; web_app uses it to mark models warm.
+MODEL_OK_HOOKS: list[Callable[[str], None]] = []
+
+# Every Ollama call goes through this scheduler: bounded concurrency per model, interactive first.
+LLM_SCHEDULER = LLMScheduler(max_in_flight=2, max_queue=8, queue_timeout=60.0)
+# After repeated connection failures agents get their fallback immediately until Ollama recovers.
+OLLAMA_BREAKER = CircuitBreaker(failure_threshold=3, reset_timeout=15.0)
+
+# Whole-turn budget, shared between the remaining agents in proportion to STAGE_WEIGHTS.
+TURN_BUDGET_SECONDS = 150.0
+STAGE_WEIGHTS = {"guard": 1.0, "world": 2.0, "rules": 2.0, "adjudicator": 3.0, "narrator": 3.0}
+DEFAULT_TIMEOUT = 120.0
+MIN_CALL_SECONDS = 1.0
+# Per-agent caps: output tokens (num_predict), stop sequences and a hard timeout per call.
+AGENT_LIMITS: Dict[str, Dict[str, Any]] = {
+    "guard": {"num_predict": 128, "stop": ["\n\n\n", "USER_INPUT:"], "timeout": 20.0},
+    "world": {"num_predict": 256, "stop": ["\n\n\n", "USER_INPUT:"], "timeout": 40.0},
+    "rules": {"num_predict": 256, "stop": ["\n\n\n", "USER_INPUT:"], "timeout": 40.0},
+    "adjudicator": {"num_predict": 384, "stop": ["\n\n\n", "USER_INPUT:"], "timeout": 60.0},
+    "narrator": {"num_predict": 512, "stop": ["USER_INPUT:"], "timeout": 60.0},
+}
+
 
 def load_text(path: Path) -> str:
     return path.read_text(encoding="utf-8")
 
 
-def ollama_generate(system_prompt: str, user_prompt: str, model: str = DEFAULT_MODEL) -> str:
+def _error_json(error: str, details: str) -> str:
+    """Error payload returned to agents instead of raising; each agent already has a fallback for it."""
+    return json.dumps({"error": error, "details": details}, ensure_ascii=False)
+
+
+def _record_http_error(exc: urllib.error.HTTPError) -> None:
+    # A 4xx (e.g. model not pulled) means the backend itself is up; only 5xx counts against it.
+    if exc.code >= 500:
+        OLLAMA_BREAKER.record_failure()
+    else:
+        OLLAMA_BREAKER.record_success()
+
+
+def ollama_generate(
+    system_prompt: str,
+    user_prompt: str,
+    model: str = DEFAULT_MODEL,
+    on_token: Optional[Callable[[str], None]] = None,
+    priority: str = "interactive",
+    agent: Optional[str] = None,
+) -> str:
+    """
+    Call Ollama through the shared scheduler; when `on_token` is given the response is streamed
+    and each chunk is forwarded. `priority` is "interactive" for turn agents, "background" otherwise.
+    `agent` selects output-token caps, stop sequences and its share of the current turn deadline.
+    """
+    limits = AGENT_LIMITS.get(agent or "", {})
+    timeout = float(limits.get("timeout", DEFAULT_TIMEOUT))
+    deadline = current_deadline()
+    if deadline is not None:
+        timeout = min(timeout, deadline.budget_for(agent) if agent else deadline.remaining())
+    if timeout < MIN_CALL_SECONDS:
+        return _error_json("Délai du tour dépassé", f"{agent or 'llm'}: {timeout:.1f}s left")
+    if OLLAMA_BREAKER.state == "open":
+        return _error_json("Ollama indisponible", "circuit breaker open")
+
+    options: Dict[str, Any] = {"temperature": 0.4}
+    if "num_predict" in limits:
+        options["num_predict"] = limits["num_predict"]
+    if "stop" in limits:
+        options["stop"] = limits["stop"]
     body = {
         "model": model,
         "prompt": f"{system_prompt}\n\nUSER_INPUT:\n{user_prompt}",
-        "stream": False,
-        "options": {"temperature": 0.4},
+        "stream": on_token is not None,
+        "keep_alive": KEEP_ALIVE,
+        "options": options,
     }
     req = urllib.request.Request(
         OLLAMA_URL,
@@ -34,42 +118,170 @@ def ollama_generate(system_prompt: str, user_prompt: str, model: str = DEFAULT_M
         headers={"Content-Type": "application/json"},
         method="POST",
     )
+    give_up_at = time.monotonic() + timeout
+
+    def call() -> str:
+        if not OLLAMA_BREAKER.allow():
+            raise CircuitOpenError("circuit breaker open")
+        try:
+            socket_timeout = max(MIN_CALL_SECONDS, give_up_at - time.monotonic())
+            with urllib.request.urlopen(req, timeout=socket_timeout) as resp:
+                if on_token is None:
+                    parsed = json.loads(resp.read().decode("utf-8"))
+                    text = str(parsed.get("response", "")).strip()
+                else:
+                    chunks = []
+                    for line in resp:
+                        if not line.strip():
+                            continue
+                        parsed = json.loads(line.decode("utf-8"))
+                        token = str(parsed.get("response", ""))
+                        if token:
+                            chunks.append(token)
+                            on_token(token)
+                        # Out of budget: keep what was streamed rather than discarding the narration.
+                        if parsed.get("done") or time.monotonic() > give_up_at:
+                            break
+                    text = "".join(chunks).strip()
+        except urllib.error.HTTPError as exc:
+            _record_http_error(exc)
+            raise
+        except BaseException:
+            # Anything else (truncated body, bad JSON line, failing on_token) must still settle a
+            # half-open probe, or the breaker would refuse every later call.
+            OLLAMA_BREAKER.record_failure()
+            raise
+        OLLAMA_BREAKER.record_success()
+        for hook in MODEL_OK_HOOKS:
+            hook(model)
+        return text
+
     try:
-        with urllib.request.urlopen(req, timeout=120) as resp:
-            parsed = json.loads(resp.read().decode("utf-8"))
-        return str(parsed.get("response", "")).strip()
-    except urllib.error.URLError as exc:
-        return (
-            "{\"error\": \"Ollama indisponible\", "
-            f"\"details\": {json.dumps(str(exc))}"
-            "}"
-        )
+        return LLM_SCHEDULER.run(model, call, priority=priority, timeout=timeout)
+    except (OSError, http.client.HTTPException, ValueError, CircuitOpenError) as exc:
+        return _error_json("Ollama indisponible", str(exc))
+    except SchedulerSaturated as exc:
+        # Same shape as a backend outage so every agent falls back the way it already does.
+        return _error_json("Ollama saturé", str(exc))
+
+
+def warm_model(model: str, keep_alive: str = KEEP_ALIVE) -> float:
+    """
+    Load `model` into Ollama memory with an empty prompt so the first turn skips the cold load.
+    Returns the load time in seconds; raises URLError/HTTPError/SchedulerSaturated on failure.
+    """
+    req = urllib.request.Request(
+        OLLAMA_URL,
+        data=json.dumps({"model": model, "prompt": "", "stream": False, "keep_alive": keep_alive}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+
+    def call() -> float:
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=300) as resp:
+                parsed = json.loads(resp.read().decode("utf-8"))
+        except urllib.error.HTTPError as exc:
+            _record_http_error(exc)
+            raise
+        except BaseException:
+            OLLAMA_BREAKER.record_failure()
+            raise
+        OLLAMA_BREAKER.record_success()
+        if parsed.get("error"):
+            raise urllib.error.URLError(str(parsed["error"]))
+        return time.perf_counter() - started
+
+    return LLM_SCHEDULER.run(model, call, priority="background", timeout=300)
 
 
 class Orchestrator:
     """Coordinates all agents and controls the only full-state execution flow."""
 
-    def __init__(self, root: Path) -> None:
+    def __init__(
+        self,
+        root: Path,
+        fused_adjudication: bool = FUSED_ADJUDICATION,
+        memory_dir: Optional[Path] = None,
+        generate: Callable[..., str] = ollama_generate,
+    ) -> None:
+        """`memory_dir` and `generate` default to root/memory and Ollama; simulate.py overrides both."""
         prompts_dir = root / "prompts"
-        memory_path = root / "memory" / "game_state.json"
+        memory_dir = memory_dir or root / "memory"
+        memory_path = memory_dir / "game_state.json"
 
         self.root = root
+        self.scheduler = LLM_SCHEDULER
+        self.breaker = OLLAMA_BREAKER
         self.memory = MemoryAgent(memory_path)
-        self.template_path = root / "memory" / "game_state.template.json"
-        self.guard = GuardAgent(ollama_generate, load_text(prompts_dir / "guard.txt"))
-        self.rules = RulesAgent(ollama_generate, load_text(prompts_dir / "rules.txt"))
-        self.world = WorldAuthorityAgent(ollama_generate, load_text(prompts_dir / "world.txt"))
-        self.narrator = NarratorAgent(ollama_generate, load_text(prompts_dir / "narrator.txt"))
+        self.template_path = memory_dir / "game_state.template.json"
+        self.router = ModelRouter(
+            {"small": SMALL_MODEL, "large": DEFAULT_MODEL},
+            log_path=memory_dir / "routing_log.jsonl",
+        )
+        self.guard = GuardAgent(RoutedLLM(self.router, "guard", generate), load_text(prompts_dir / "guard.txt"))
+        self.rules = RulesAgent(RoutedLLM(self.router, "rules", generate), load_text(prompts_dir / "rules.txt"))
+        self.world = WorldAuthorityAgent(
+            RoutedLLM(self.router, "world", generate), load_text(prompts_dir / "world.txt")
+        )
+        self.narrator = NarratorAgent(
+            RoutedLLM(self.router, "narrator", generate), load_text(prompts_dir / "narrator.txt")
+        )
+        self.saves = SaveSlotStore(self.memory)
+        self._turns_since_save = 0
+        self.fused_adjudication = fused_adjudication
+        self.adjudicator = AdjudicatorAgent(
+            RoutedLLM(self.router, "adjudicator", generate), load_text(prompts_dir / "adjudicator.txt")
+        )
+        # Turns from several web threads must not interleave; other processes are handled by the
+        # file lock in MemoryAgent.transaction().
+        self._turn_lock = threading.Lock()
+
+    def configured_models(self) -> list[str]:
+        """Models the agents may call; warmed up by the web server at startup."""
+        return self.router.models()
 
     def _action_is_reset(self, action: str) -> bool:
         return action.casefold() in RESET_ALIASES
 
-    def handle_action(self, action: str, confirm_reset: bool = False) -> Dict[str, Any]:
-        """Process one player action and persist changes. Returns UI-ready JSON-like data."""
+    def handle_action(
+        self,
+        action: str,
+        confirm_reset: bool = False,
+        emit: Optional[EventCallback] = None,
+    ) -> Dict[str, Any]:
+        """
+        Process one player action and persist changes. Returns UI-ready JSON-like data.
+        `emit(event, data)` is called as each stage completes so progress can be pushed to clients.
+        """
+        if self.fused_adjudication:
+            stages = ["guard", "adjudicator", "narrator"]
+        else:
+            stages = ["guard", "world", "rules", "narrator"]
+        with self._turn_lock, use_deadline(Deadline(TURN_BUDGET_SECONDS, stages, STAGE_WEIGHTS)):
+            started = time.perf_counter()
+
+            def stage(event: str, data: Dict[str, Any]) -> None:
+                if emit is not None:
+                    emit(event, {**data, "elapsed_ms": round((time.perf_counter() - started) * 1000)})
+
+            result = self._handle_action(action, confirm_reset, stage, stream_narration=emit is not None)
+            stage("turn_finished", {"status": result.get("status"), "message": result.get("message", "")})
+            return result
+
+    def _handle_action(
+        self,
+        action: str,
+        confirm_reset: bool,
+        stage: EventCallback,
+        stream_narration: bool,
+    ) -> Dict[str, Any]:
         state = self.memory.load()
         trimmed = action.strip()
         if not trimmed:
             return {"status": "empty", "message": "Veuillez saisir une action."}
+        stage("turn_started", {"action": trimmed})
 
         if self._action_is_reset(trimmed):
             if not confirm_reset:
@@ -78,23 +290,30 @@ class Orchestrator:
                     "message": "Tapez RESET pour confirmer la réinitialisation de la mémoire.",
                 }
             state = self.memory.reset_from_template(self.template_path)
+            observable = self.memory.get_observable_context(state)
+            stage("state_snapshot", {"observable": observable})
             return {
                 "status": "reset_done",
                 "message": "Réinitialisation de la mémoire terminée.",
-                "observable": self.memory.get_observable_context(state),
+                "observable": observable,
             }
 
         observable = self.memory.get_observable_context(state)
+        self.router.begin_turn(trimmed, observable)
         guard_result = self.guard.review_action(trimmed, observable)
+        self.router.note_guard(guard_result)
+        stage("guard_decided", {"guard": guard_result})
         if not guard_result.get("allowed", False):
-            state.setdefault("log", []).append(
-                {
-                    "action": trimmed,
-                    "guard": guard_result,
-                    "result": "blocked",
-                }
-            )
-            self.memory.save(state)
+            with self.memory.transaction() as state:
+                state.setdefault("log", []).append(
+                    {
+                        "action": trimmed,
+                        "guard": guard_result,
+                        "result": "blocked",
+                    }
+                )
+            self._autosave(state)
+            stage("state_delta", {"delta": observable_delta(observable, self.memory.get_observable_context(state))})
             return {
                 "status": "guard_veto",
                 "message": guard_result.get("reason", "Action refusée."),
@@ -104,22 +323,37 @@ class Orchestrator:
 
         hidden_context = state.get("hidden", {})
         scenario_context = state.get("scenario", {})
-        world_result = self.world.validate_action(
-            trimmed,
-            observable,
-            hidden_context,
-            scenario_context,
-        )
-        if not world_result.get("plausible", False):
-            state.setdefault("log", []).append(
-                {
-                    "action": trimmed,
-                    "guard": guard_result,
-                    "world": world_result,
-                    "result": "implausible",
-                }
+        rules_context = state.get("rules", {})
+        rules_result: Optional[Dict[str, Any]] = None
+        if self.fused_adjudication:
+            world_result, rules_result = self.adjudicator.adjudicate(
+                trimmed,
+                observable,
+                hidden_context,
+                scenario_context,
+                rules_context,
+                d20_roll=randint(1, 20),
+            )
+        else:
+            world_result = self.world.validate_action(
+                trimmed,
+                observable,
+                hidden_context,
+                scenario_context,
             )
-            self.memory.save(state)
+        stage("world_decided", {"world": world_result})
+        if not world_result.get("plausible", False):
+            with self.memory.transaction() as state:
+                state.setdefault("log", []).append(
+                    {
+                        "action": trimmed,
+                        "guard": guard_result,
+                        "world": world_result,
+                        "result": "implausible",
+                    }
+                )
+            self._autosave(state)
+            stage("state_delta", {"delta": observable_delta(observable, self.memory.get_observable_context(state))})
             return {
                 "status": "world_veto",
                 "message": world_result.get("reason", "Action invraisemblable."),
@@ -128,31 +362,38 @@ class Orchestrator:
                 "observable": observable,
             }
 
-        rules_context = state.get("rules", {})
-        rules_result = self.rules.evaluate_action(
-            trimmed,
-            observable,
-            world_result,
-            rules_context,
-        )
-        self._apply_effects(state, rules_result, world_result)
-        state.setdefault("log", []).append(
-            {
-                "action": trimmed,
-                "guard": guard_result,
-                "world": world_result,
-                "rules": rules_result,
-                "result": "resolved",
-            }
-        )
-        self.memory.save(state)
+        if rules_result is None:
+            rules_result = self.rules.evaluate_action(
+                trimmed,
+                observable,
+                world_result,
+                rules_context,
+            )
+        stage("rules_rolled", {"rules": rules_result})
+        # Effects are deltas, so they are re-applied to the latest saved state: another process
+        # (CLI, import, second web worker) may have written it while the agents were running.
+        with self.memory.transaction() as state:
+            self._apply_effects(state, rules_result, world_result)
+            state.setdefault("log", []).append(
+                {
+                    "action": trimmed,
+                    "guard": guard_result,
+                    "world": world_result,
+                    "rules": rules_result,
+                    "result": "resolved",
+                }
+            )
+
+        self._autosave(state)
 
         fresh_observable = self.memory.get_observable_context(state)
+        stage("state_delta", {"delta": observable_delta(observable, fresh_observable)})
         narration = self.narrator.narrate_turn(
             fresh_observable,
             trimmed,
             guard_result,
             rules_result,
+            on_token=(lambda token: stage("narration_token", {"token": token})) if stream_narration else None,
         )
         return {
             "status": "resolved",
@@ -163,6 +404,46 @@ class Orchestrator:
             "observable": fresh_observable,
         }
 
+    def _autosave(self, state: Dict[str, Any]) -> None:
+        self._turns_since_save += 1
+        if AUTOSAVE_EVERY_TURNS and self._turns_since_save >= AUTOSAVE_EVERY_TURNS:
+            self.saves.save(state=state)
+            self._turns_since_save = 0
+
+    def save_slot_command(self, op: str, slot: Optional[str] = None, source: Optional[str] = None) -> Dict[str, Any]:
+        """Run a save-slot operation between turns. Returns UI-ready JSON-like data."""
+        with self._turn_lock:
+            if op == "save":
+                message = f"Partie sauvegardée dans « {self.saves.save(slot)} »."
+                self._turns_since_save = 0
+            elif op == "branch":
+                if not slot:
+                    raise ValueError("Nom du nouvel emplacement requis.")
+                message = f"Emplacement « {self.saves.branch(slot, source)} » créé."
+            elif op == "switch":
+                if not slot:
+                    raise ValueError("Nom de l'emplacement requis.")
+                self.saves.switch(slot)
+                self._turns_since_save = 0
+                message = f"Emplacement « {slot} » chargé."
+            elif op == "delete":
+                if not slot:
+                    raise ValueError("Nom de l'emplacement requis.")
+                self.saves.delete(slot)
+                message = f"Emplacement « {slot} » supprimé."
+            elif op == "gc":
+                message = f"{self.saves.gc()} blobs inutilisés supprimés."
+            elif op == "list":
+                message = ""
+            else:
+                raise ValueError(f"Opération inconnue : {op}")
+            return {
+                "status": "ok",
+                "message": message,
+                "current": self.saves.current(),
+                "slots": self.saves.list_slots(),
+            }
+
     def run(self) -> None:
         print("Prototype GM local démarré. Tapez 'quit' pour quitter.")
 
@@ -172,8 +453,8 @@ class Orchestrator:
             if not action:
                 continue
             if action.lower() in {"quit", "exit"}:
-                state = self.memory.load()
-                self.memory.save(state)
+                with self.memory.transaction():
+                    pass
                 print("Partie sauvegardée. Au revoir.")
                 break
 
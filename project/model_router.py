@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Keys that must be present for a JSON agent answer to count as valid.
+REQUIRED_KEYS = {
+    "guard": ("allowed",),
+    "world": ("plausible",),
+    "rules": ("outcome",),
+    "adjudicator": ("plausible",),
+}
+# Keys required only when a flag in the answer is true: the adjudicator rolls only plausible actions.
+REQUIRED_IF = {
+    "adjudicator": ("plausible", ("outcome",)),
+}
+
+
+@dataclass
+class RouteDecision:
+    agent: str
+    tier: str
+    model: str
+    reasons: List[str] = field(default_factory=list)
+
+
+@dataclass
+class TurnSignals:
+    action: str = ""
+    mentions_npc: bool = False
+    risk_level: str = "low"
+
+
+class ModelRouter:
+    """
+    Picks a model tier per agent per turn from cheap signals already available to the orchestrator:
+    guard risk level, action length, NPC mentions and recent invalid answers from the small tier.
+    """
+
+    def __init__(
+        self,
+        tiers: Dict[str, str],
+        long_action_chars: int = 120,
+        failure_threshold: int = 2,
+        failure_cooldown_turns: int = 5,
+        min_confidence: float = 0.5,
+        log_path: Optional[Path] = None,
+    ) -> None:
+        self.tiers = tiers
+        self.long_action_chars = long_action_chars
+        self.failure_threshold = failure_threshold
+        self.failure_cooldown_turns = failure_cooldown_turns
+        self.min_confidence = min_confidence
+        self.log_path = log_path
+        self._signals = TurnSignals()
+        self._turn = 0
+        self._failures: Dict[str, int] = {}
+        self._pinned_until: Dict[str, int] = {}
+        self._latency: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.tiers["small"] != self.tiers["large"]
+
+    def models(self) -> List[str]:
+        return sorted(set(self.tiers.values()))
+
+    def begin_turn(self, action: str, observable: Dict[str, Any]) -> None:
+        lowered = action.casefold()
+        npcs = observable.get("world", {}).get("known_npcs", [])
+        mentions_npc = any(
+            part.casefold() in lowered
+            for npc in npcs
+            for part in str(npc.get("name", "")).split()
+            if len(part) > 2
+        )
+        with self._lock:
+            self._turn += 1
+            self._signals = TurnSignals(action=action, mentions_npc=mentions_npc)
+
+    def note_guard(self, guard_result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._signals.risk_level = str(guard_result.get("risk_level", "low"))
+
+    def route(self, agent: str) -> RouteDecision:
+        with self._lock:
+            signals = self._signals
+            reasons = []
+            if self._pinned_until.get(agent, 0) >= self._turn:
+                reasons.append("recent_small_failures")
+            if agent != "guard":
+                if signals.risk_level in {"medium", "high"}:
+                    reasons.append(f"risk_{signals.risk_level}")
+                if signals.mentions_npc:
+                    reasons.append("mentions_known_npc")
+            if len(signals.action) > self.long_action_chars:
+                reasons.append("long_action")
+        tier = "large" if reasons else "small"
+        return RouteDecision(agent=agent, tier=tier, model=self.tiers[tier], reasons=reasons or ["simple_action"])
+
+    def is_valid(self, agent: str, raw: str) -> bool:
+        if agent not in REQUIRED_KEYS:
+            return bool(raw.strip()) and not raw.lstrip().startswith("{\"error\"")
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
+            return False
+        if not isinstance(data, dict) or "error" in data:
+            return False
+        if any(key not in data for key in REQUIRED_KEYS[agent]):
+            return False
+        if agent in REQUIRED_IF:
+            flag, keys = REQUIRED_IF[agent]
+            if data.get(flag) and any(key not in data for key in keys):
+                return False
+        confidence = data.get("confidence")
+        if isinstance(confidence, (int, float)) and confidence < self.min_confidence:
+            return False
+        return True
+
+    def record(self, decision: RouteDecision, latency: float, valid: bool, escalated: bool) -> None:
+        """Update failure/latency statistics and append one line to the routing log."""
+        with self._lock:
+            key = (decision.agent, decision.tier)
+            previous = self._latency.get(key)
+            self._latency[key] = latency if previous is None else 0.8 * previous + 0.2 * latency
+
+            if decision.tier == "small":
+                if valid:
+                    self._failures[decision.agent] = 0
+                else:
+                    self._failures[decision.agent] = self._failures.get(decision.agent, 0) + 1
+                    if self._failures[decision.agent] >= self.failure_threshold:
+                        self._pinned_until[decision.agent] = self._turn + self.failure_cooldown_turns
+                        self._failures[decision.agent] = 0
+
+            large_latency = self._latency.get((decision.agent, "large"))
+            turn = self._turn
+
+        saved = None
+        if decision.tier == "small" and large_latency is not None:
+            saved = round(large_latency - latency, 3)
+        self._log(
+            {
+                "ts": round(time.time(), 3),
+                "turn": turn,
+                "agent": decision.agent,
+                "tier": decision.tier,
+                "model": decision.model,
+                "reasons": decision.reasons,
+                "latency_s": round(latency, 3),
+                "valid": valid,
+                "escalated": escalated,
+                "estimated_saved_s": saved,
+            }
+        )
+
+    def _log(self, record: Dict[str, Any]) -> None:
+        if self.log_path is None:
+            return
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock, self.log_path.open("a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class RoutedLLM:
+    """
+    LLM callable handed to one agent: routes each call to a model tier and escalates
+    invalid or low-confidence small-tier answers to the large tier.
+    """
+
+    def __init__(self, router: ModelRouter, agent: str, generate: Callable[..., str]) -> None:
+        self.router = router
+        self.agent = agent
+        self.generate = generate
+
+    def __call__(self, system_prompt: str, user_prompt: str, **kwargs: Any) -> str:
+        if not self.router.enabled:
+            # A single tier: nothing to route, log or pin.
+            model = self.router.tiers["large"]
+            return self.generate(system_prompt, user_prompt, model=model, agent=self.agent, **kwargs)
+        decision = self.router.route(self.agent)
+        started = time.perf_counter()
+        raw = self.generate(system_prompt, user_prompt, model=decision.model, agent=self.agent, **kwargs)
+        valid = self.router.is_valid(self.agent, raw)
+        self.router.record(decision, time.perf_counter() - started, valid, escalated=False)
+        if valid or decision.tier == "large":
+            return raw
+
+        escalation = RouteDecision(
+            agent=self.agent,
+            tier="large",
+            model=self.router.tiers["large"],
+            reasons=["escalated_invalid_small_output"],
+        )
+        started = time.perf_counter()
+        raw = self.generate(system_prompt, user_prompt, model=escalation.model, agent=self.agent, **kwargs)
+        self.router.record(
+            escalation,
+            time.perf_counter() - started,
+            self.router.is_valid(self.agent, raw),
+            escalated=True,
+        )
+        return raw
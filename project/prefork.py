@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import re
+import signal
+import socket
+import threading
+import time
+import traceback
+import zlib
+from typing import Callable, Dict, Tuple
+
+PEEK_BYTES = 8192
+PEEK_TIMEOUT = 5.0
+# A worker dying this soon after being forked is treated as a startup failure, not a crash.
+FAST_FAIL_SECONDS = 10.0
+
+_SESSION_QUERY = re.compile(rb"[?&]session=([^&\s#]+)")
+_SESSION_HEADER = re.compile(rb"\r\nx-gamejee-session:[ \t]*([^\r\n]+)", re.IGNORECASE)
+
+ConnectionHandler = Callable[[socket.socket, Tuple[str, int]], None]
+
+
+def session_key(head: bytes) -> bytes | None:
+    """Find the session in the request line (`?session=`) or an `X-GameJee-Session` header."""
+    request_line = head.split(b"\r\n", 1)[0]
+    match = _SESSION_QUERY.search(request_line)
+    if match:
+        return match.group(1)
+    match = _SESSION_HEADER.search(head)
+    return match.group(1).strip() if match else None
+
+
+def _peek_head(conn: socket.socket) -> bytes:
+    """Read request headers without consuming them, so the worker still sees the full request."""
+    deadline = time.monotonic() + PEEK_TIMEOUT
+    conn.settimeout(PEEK_TIMEOUT)
+    head = conn.recv(PEEK_BYTES, socket.MSG_PEEK)
+    while head and b"\r\n\r\n" not in head and len(head) < PEEK_BYTES and time.monotonic() < deadline:
+        time.sleep(0.005)
+        head = conn.recv(PEEK_BYTES, socket.MSG_PEEK)
+    return head
+
+
+def receive_connections(channel: socket.socket, handle: ConnectionHandler) -> None:
+    """Worker loop: accept client sockets passed by the parent until the parent goes away."""
+    parent = os.getppid()
+    channel.settimeout(1.0)
+    while os.getppid() == parent:
+        try:
+            message, fds, _flags, _addr = socket.recv_fds(channel, 1024, 1)
+        except socket.timeout:
+            continue
+        for fd in fds:
+            client_address = tuple(json.loads(message.decode("utf-8")))
+            handle(socket.socket(fileno=fd), client_address)
+
+
+class PreforkServer:
+    """
+    Binds once, forks `workers` processes and hands each accepted connection to a worker.
+    Connections carrying the same session always go to the same worker, so a session's turns,
+    event subscribers and in-process caches live in one place; session-less requests round-robin.
+    """
+
+    def __init__(self, address: Tuple[str, int], workers: int, worker_main: Callable[[socket.socket], None]) -> None:
+        if not hasattr(os, "fork") or not hasattr(socket, "send_fds"):
+            raise RuntimeError("Multi-worker mode needs os.fork and socket.send_fds (Linux/macOS).")
+        self.address = address
+        self.workers = workers
+        self.worker_main = worker_main
+        self.exit_code = 0
+        self._channels: Dict[int, socket.socket] = {}
+        self._send_locks = {index: threading.Lock() for index in range(workers)}
+        self._pids: Dict[int, Tuple[int, float]] = {}
+        self._round_robin = itertools.count()
+        self._listener: socket.socket | None = None
+
+    def _spawn(self, index: int) -> None:
+        parent_end, child_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGINT, signal.SIG_IGN)
+                parent_end.close()
+                if self._listener is not None:
+                    self._listener.close()
+                for channel in self._channels.values():
+                    channel.close()
+                self.worker_main(child_end)
+            except BaseException:  # noqa: BLE001 - the child must never return into the parent loop
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+
+        child_end.close()
+        previous = self._channels.get(index)
+        self._channels[index] = parent_end
+        if previous is not None:
+            previous.close()
+        self._pids[pid] = (index, time.monotonic())
+
+    def _reap(self) -> bool:
+        """Restart crashed workers; returns False when a worker failed at startup."""
+        while self._pids:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return True
+            index, started = self._pids.pop(pid)
+            code = os.waitstatus_to_exitcode(status)
+            if code != 0 and time.monotonic() - started < FAST_FAIL_SECONDS:
+                print(f"Worker {index} failed during startup (exit {code}); stopping.")
+                self.exit_code = 1
+                return False
+            print(f"Worker {index} exited (code {code}); restarting.")
+            self._spawn(index)
+        return True
+
+    def _dispatch(self, conn: socket.socket, client_address: Tuple[str, int]) -> None:
+        try:
+            key = session_key(_peek_head(conn))
+            conn.setblocking(True)
+            index = zlib.crc32(key) % self.workers if key else next(self._round_robin) % self.workers
+            with self._send_locks[index]:
+                socket.send_fds(
+                    self._channels[index],
+                    [json.dumps(list(client_address[:2])).encode("utf-8")],
+                    [conn.fileno()],
+                )
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def serve_forever(self) -> int:
+        self._listener = socket.create_server(self.address, backlog=128)
+        self._listener.settimeout(1.0)
+        for index in range(self.workers):
+            self._spawn(index)
+
+        try:
+            while self._reap():
+                try:
+                    conn, client_address = self._listener.accept()
+                except socket.timeout:
+                    continue
+                threading.Thread(target=self._dispatch, args=(conn, client_address), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._listener.close()
+            for pid in list(self._pids):
+                os.kill(pid, signal.SIGTERM)
+            for pid in list(self._pids):
+                os.waitpid(pid, 0)
+        return self.exit_code
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Iterable
+
+
+class Readiness:
+    """Tracks startup progress: orchestrator construction and per-model warm state."""
+
+    def __init__(self) -> None:
+        self.started_at = time.monotonic()
+        self.orchestrator = "pending"
+        self.fatal_error: str | None = None
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def expect_models(self, models: Iterable[str]) -> None:
+        with self._lock:
+            for model in models:
+                self._models.setdefault(model, {"state": "pending"})
+
+    def mark_model(self, model: str, state: str, **details: Any) -> None:
+        with self._lock:
+            self._models[model] = {"state": state, **details}
+
+    def is_warm(self, model: str) -> bool:
+        with self._lock:
+            return self._models.get(model, {}).get("state") == "warm"
+
+    def note_model_ok(self, model: str) -> None:
+        """A real generation succeeded, so the model is loaded even if warm-up has not finished."""
+        with self._lock:
+            if model in self._models and self._models[model]["state"] != "warm":
+                self._models[model] = {"state": "warm", "source": "generation"}
+
+    def mark_orchestrator(self, state: str, error: str | None = None) -> None:
+        with self._lock:
+            self.orchestrator = state
+            if error:
+                self.fatal_error = error
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return self.orchestrator == "ready" and all(
+                info["state"] == "warm" for info in self._models.values()
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        ready = self.is_ready()
+        with self._lock:
+            return {
+                "ready": ready,
+                "uptime_s": round(time.monotonic() - self.started_at, 1),
+                "orchestrator": self.orchestrator,
+                "models": {model: dict(info) for model, info in self._models.items()},
+            }
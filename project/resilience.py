@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+_current_deadline: contextvars.ContextVar[Optional["Deadline"]] = contextvars.ContextVar(
+    "turn_deadline", default=None
+)
+
+
+class Deadline:
+    """
+    Overall time budget for one turn, shared out between the agents still to run.
+    An agent gets `remaining * its weight / weight of itself and every later stage`, so a slow
+    early stage shrinks later budgets instead of pushing the turn past its limit.
+    """
+
+    def __init__(self, total_seconds: float, stages: List[str], weights: Dict[str, float]) -> None:
+        self.expires_at = time.monotonic() + total_seconds
+        self.stages = stages
+        self.weights = weights
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def budget_for(self, agent: str) -> float:
+        remaining = self.remaining()
+        if agent not in self.stages:
+            return remaining
+        later = self.stages[self.stages.index(agent):]
+        share = self.weights.get(agent, 1.0) / sum(self.weights.get(stage, 1.0) for stage in later)
+        return remaining * share
+
+
+@contextmanager
+def use_deadline(deadline: Deadline) -> Iterator[Deadline]:
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed: calls pass. After `failure_threshold` consecutive failures: open, calls fail fast.
+    After `reset_timeout` seconds: half-open, one probe call decides whether to close again.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 15.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from agents.memory import MemoryAgent
+
+# The log only grows, so it is stored in fixed-size chunks: every full chunk is shared by all slots.
+LOG_CHUNK_SIZE = 32
+DEFAULT_SLOT = "main"
+_SLOT_NAME = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+def _canonical(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def _write_atomic(path: Path, raw: bytes) -> None:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp_path.write_bytes(raw)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+class SaveSlotStore:
+    """
+    Save slots stored as content-addressed blobs under memory/saves/.
+    A slot is a small manifest of section hashes, so unchanged sections (rules, scenario, hidden,
+    older log chunks) are stored once across every slot, and branching only copies the manifest.
+    """
+
+    def __init__(self, memory: MemoryAgent) -> None:
+        self.memory = memory
+        self.root = memory.path.parent / "saves"
+        self.blob_dir = self.root / "blobs"
+        self.manifest_path = self.root / "slots.json"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / f"{digest}.json"
+
+    def _put_blob(self, value: Any) -> str:
+        raw = _canonical(value)
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self._blob_path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            _write_atomic(path, raw)
+        return digest
+
+    def _get_blob(self, digest: str) -> Any:
+        return json.loads(self._blob_path(digest).read_text(encoding="utf-8"))
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        if not self.manifest_path.exists():
+            return {"current": DEFAULT_SLOT, "slots": {}}
+        return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+
+    def _save_manifest(self, manifest: Dict[str, Any]) -> None:
+        _write_atomic(self.manifest_path, json.dumps(manifest, indent=2, ensure_ascii=False).encode("utf-8"))
+
+    def _slot(self, manifest: Dict[str, Any], name: str) -> Dict[str, Any]:
+        if name not in manifest["slots"]:
+            raise ValueError(f"Emplacement de sauvegarde inconnu : {name}")
+        return manifest["slots"][name]
+
+    @staticmethod
+    def _check_name(name: str) -> str:
+        if not _SLOT_NAME.match(name):
+            raise ValueError(
+                "Le nom d'un emplacement utilise des lettres, chiffres, '.', '_' ou '-' (64 caractères maximum)."
+            )
+        return name
+
+    def current(self) -> str:
+        return self._load_manifest()["current"]
+
+    def list_slots(self) -> List[Dict[str, Any]]:
+        manifest = self._load_manifest()
+        return [
+            {
+                "name": name,
+                "current": name == manifest["current"],
+                "turns": slot.get("turns", 0),
+                "parent": slot.get("parent"),
+                "updated_at": slot.get("updated_at"),
+            }
+            for name, slot in sorted(manifest["slots"].items())
+        ]
+
+    def save(self, name: str | None = None, state: Dict[str, Any] | None = None) -> str:
+        """Store `state` (default: the live game state) into slot `name` (default: current slot)."""
+        with self.memory.lock():
+            manifest = self._load_manifest()
+            name = self._check_name(name or manifest["current"])
+            state = self.memory.load() if state is None else state
+            log = state.get("log", [])
+            previous = manifest["slots"].get(name, {})
+            manifest["slots"][name] = {
+                "sections": {key: self._put_blob(value) for key, value in state.items() if key != "log"},
+                "log_chunks": [
+                    self._put_blob(log[start:start + LOG_CHUNK_SIZE])
+                    for start in range(0, len(log), LOG_CHUNK_SIZE)
+                ],
+                "turns": len(log),
+                "parent": previous.get("parent"),
+                "updated_at": round(time.time()),
+            }
+            self._save_manifest(manifest)
+        return name
+
+    def branch(self, new_name: str, source: str | None = None) -> str:
+        """Create `new_name` pointing at the same blobs as `source` (default: current slot)."""
+        with self.memory.lock():
+            manifest = self._load_manifest()
+            source = source or manifest["current"]
+            if source == manifest["current"]:
+                # Branching "from here" must include turns played since the last autosave.
+                self.save(source)
+                manifest = self._load_manifest()
+            self._check_name(new_name)
+            if new_name in manifest["slots"]:
+                raise ValueError(f"L'emplacement de sauvegarde existe déjà : {new_name}")
+            origin = self._slot(manifest, source)
+            manifest["slots"][new_name] = {
+                **origin,
+                "sections": dict(origin["sections"]),
+                "log_chunks": list(origin["log_chunks"]),
+                "parent": source,
+                "updated_at": round(time.time()),
+            }
+            self._save_manifest(manifest)
+        return new_name
+
+    def materialize(self, name: str) -> Dict[str, Any]:
+        slot = self._slot(self._load_manifest(), name)
+        state = {key: self._get_blob(digest) for key, digest in slot["sections"].items()}
+        state["log"] = [entry for digest in slot["log_chunks"] for entry in self._get_blob(digest)]
+        return state
+
+    def switch(self, name: str) -> Dict[str, Any]:
+        """Save the live state into the current slot, then load slot `name` into game_state.json."""
+        with self.memory.lock():
+            manifest = self._load_manifest()
+            self._slot(manifest, name)
+            if self.memory.path.exists():
+                self.save(manifest["current"])
+            state = self.materialize(name)
+            self.memory.save(state)
+            manifest = self._load_manifest()
+            manifest["current"] = name
+            self._save_manifest(manifest)
+        return state
+
+    def delete(self, name: str) -> None:
+        with self.memory.lock():
+            manifest = self._load_manifest()
+            self._slot(manifest, name)
+            if name == manifest["current"]:
+                raise ValueError("Impossible de supprimer l'emplacement en cours ; chargez-en un autre d'abord.")
+            del manifest["slots"][name]
+            self._save_manifest(manifest)
+
+    def gc(self) -> int:
+        """Delete blobs no slot references; returns how many were removed."""
+        with self.memory.lock():
+            manifest = self._load_manifest()
+            referenced = {
+                digest
+                for slot in manifest["slots"].values()
+                for digest in [*slot["sections"].values(), *slot["log_chunks"]]
+            }
+            removed = 0
+            for path in self.blob_dir.glob("*/*.json"):
+                if path.stem not in referenced:
+                    path.unlink()
+                    removed += 1
+        return removed
+
+
+def run_command(store: SaveSlotStore, args: argparse.Namespace) -> None:
+    if args.command == "list":
+        for slot in store.list_slots():
+            marker = "*" if slot["current"] else " "
+            parent = f" (from {slot['parent']})" if slot["parent"] else ""
+            print(f"{marker} {slot['name']}: {slot['turns']} turns{parent}")
+    elif args.command == "save":
+        print(f"Saved slot: {store.save(args.slot)}")
+    elif args.command == "branch":
+        print(f"Created slot: {store.branch(args.slot, args.source)}")
+    elif args.command == "switch":
+        store.switch(args.slot)
+        print(f"Switched to slot: {args.slot}")
+    elif args.command == "delete":
+        store.delete(args.slot)
+        print(f"Deleted slot: {args.slot}")
+    elif args.command == "gc":
+        print(f"Removed {store.gc()} unreferenced blobs.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage save slots for memory/game_state.json.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List save slots")
+    save_cmd = sub.add_parser("save", help="Save the current game into a slot (default: current slot)")
+    save_cmd.add_argument("slot", nargs="?")
+    branch_cmd = sub.add_parser("branch", help="Create a new slot from an existing one")
+    branch_cmd.add_argument("slot")
+    branch_cmd.add_argument("--from", dest="source", help="Source slot (default: current slot)")
+    switch_cmd = sub.add_parser("switch", help="Save the current slot, then load another one")
+    switch_cmd.add_argument("slot")
+    delete_cmd = sub.add_parser("delete", help="Delete a slot (its blobs are removed by gc)")
+    delete_cmd.add_argument("slot")
+    sub.add_parser("gc", help="Remove blobs no slot references")
+    args = parser.parse_args()
+
+    root = Path(__file__).resolve().parent
+    store = SaveSlotStore(MemoryAgent(root / "memory" / "game_state.json"))
+
+    try:
+        run_command(store, args)
+    except ValueError as exc:
+        print(exc)
+        raise SystemExit(1) from exc
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import main as engine
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+
+# Used by `--policy random` when no action file is given; mixes trivial, social and impossible actions.
+POLICY_ACTIONS = [
+    "I wait and watch the street.",
+    "I look around the square.",
+    "I ask Innkeeper Brann about the missing caravan.",
+    "I ask Captain Ilyra if the militia needs help.",
+    "I walk to the North Gate Watchtower.",
+    "I rest at The Reed Lantern Inn.",
+    "I search the Old Shrine Path for tracks.",
+    "I light my torch and follow the river north.",
+    "I shoot an arrow at the nearest bandit.",
+    "I teleport to the bandit camp.",
+]
+
+# Event that closes each stage, in turn order; the stage lasts since the previous event.
+STAGE_EVENTS = [
+    ("guard_decided", "guard"),
+    ("world_decided", "world"),
+    ("rules_rolled", "rules"),
+    ("state_delta", "apply"),
+    ("turn_finished", "narrator"),
+]
+
+_stub_latency = 0.0
+
+
+def stub_generate(
+    system_prompt: str,
+    user_prompt: str,
+    model: str = engine.DEFAULT_MODEL,
+    on_token: Optional[Callable[[str], None]] = None,
+    **_: Any,
+) -> str:
+    """Offline stand-in for ollama_generate: answers every agent schema, deterministic per prompt."""
+    if _stub_latency:
+        time.sleep(_stub_latency)
+    rng = random.Random(hashlib.sha256(user_prompt.encode("utf-8")).digest())
+    payload = json.loads(user_prompt)
+    required = payload.get("required_output", {})
+    action = str(payload.get("player_action", "")).casefold()
+
+    data: Dict[str, Any] = {}
+    if "allowed" in required:
+        impossible = "teleport" in action
+        data.update(
+            {
+                "allowed": not impossible,
+                "block_category": "impossible" if impossible else "none",
+                "reason": "Stub guard.",
+                "risk_level": rng.choice(["low", "low", "medium", "high"]),
+            }
+        )
+    if "plausible" in required:
+        data.update(
+            {
+                "plausible": rng.random() > 0.1,
+                "reason": "Stub world.",
+                "world_effects": {"location_change": None, "npc_updates": [], "flag_updates": {}},
+            }
+        )
+    if "outcome" in required:
+        roll = int(payload.get("d20_roll", 10))
+        outcome = "success" if roll >= 12 else "partial_success" if roll >= 7 else "failure"
+        data.update(
+            {
+                "outcome": outcome,
+                "difficulty": 12,
+                "mechanical_effects": {
+                    "hp_delta": -1 if outcome == "failure" else 0,
+                    "xp_delta": 10 if outcome == "success" else 0,
+                    "inventory_changes": [],
+                    "new_flags": {},
+                },
+                "reasoning": "Stub rules.",
+            }
+        )
+    if data:
+        return json.dumps(data)
+
+    text = "La pluie tombe sur Mossgate. Que faites-vous ensuite ?"
+    if on_token is not None:
+        on_token(text)
+    return text
+
+
+def load_actions(path: Path) -> List[str]:
+    """Read one action per line (.txt) or per JSON line (.jsonl: a string or {"action": ...})."""
+    actions = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if path.suffix == ".jsonl":
+            item = json.loads(line)
+            line = str(item.get("action", "")) if isinstance(item, dict) else str(item)
+        actions.append(line)
+    return actions
+
+
+def _stage_timings(events: List[tuple[str, int]], fused: bool, resolved: bool) -> Dict[str, int]:
+    seen = {}
+    for name, elapsed_ms in events:
+        seen.setdefault(name, elapsed_ms)
+    timings = {}
+    previous = seen.get("turn_started", 0)
+    for event, stage in STAGE_EVENTS:
+        if event not in seen:
+            continue
+        if fused and stage == "world":
+            stage = "adjudicator"
+        elif fused and stage == "rules":
+            continue
+        if stage == "narrator" and not resolved:
+            break
+        timings[stage] = seen[event] - previous
+        previous = seen[event]
+    timings["total"] = seen.get("turn_finished", previous)
+    return timings
+
+
+def _init_worker(llm_in_flight: int, stub_latency: float) -> None:
+    global _stub_latency
+    _stub_latency = stub_latency
+    engine.LLM_SCHEDULER.max_in_flight = llm_in_flight
+
+
+def run_campaign(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Play one campaign in its own memory directory; runs inside a worker process."""
+    index = spec["index"]
+    seed = spec["seed"] + index
+    random.seed(seed)
+    memory_dir = Path(spec["work_dir"]) / f"campaign-{index:04d}" / "memory"
+    memory_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copy(PROJECT_ROOT / "memory" / "game_state.template.json", memory_dir / "game_state.template.json")
+
+    generate = stub_generate if spec["llm"] == "stub" else engine.ollama_generate
+    orchestrator = engine.Orchestrator(
+        PROJECT_ROOT,
+        fused_adjudication=spec["fused"],
+        memory_dir=memory_dir,
+        generate=generate,
+    )
+    actions = spec["actions"]
+    if not actions:
+        rng = random.Random(seed)
+        actions = [rng.choice(POLICY_ACTIONS) for _ in range(spec["turns"])]
+
+    records = []
+    started = time.perf_counter()
+    for turn, action in enumerate(actions, start=1):
+        events: List[tuple[str, int]] = []
+        result = orchestrator.handle_action(
+            action,
+            emit=lambda event, data: events.append((event, data["elapsed_ms"])),
+        )
+        rules = result.get("rules") or {}
+        records.append(
+            {
+                "type": "turn",
+                "campaign": index,
+                "turn": turn,
+                "action": action,
+                "status": result.get("status"),
+                "outcome": rules.get("outcome"),
+                "d20_roll": rules.get("d20_roll"),
+                "narration_tokens": sum(1 for name, _ in events if name == "narration_token"),
+                "timings_ms": _stage_timings(events, spec["fused"], result.get("status") == "resolved"),
+            }
+        )
+
+    character = orchestrator.memory.load().get("character", {})
+    return {
+        "records": records,
+        "campaign": {
+            "type": "campaign",
+            "campaign": index,
+            "turns": len(records),
+            "wall_s": round(time.perf_counter() - started, 3),
+            "final_hp": character.get("hp"),
+            "final_xp": character.get("xp"),
+            "memory_dir": str(memory_dir),
+        },
+    }
+
+
+def _percentile(values: List[int], fraction: float) -> int:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(records: List[Dict[str, Any]], campaigns: List[Dict[str, Any]], wall_s: float) -> Dict[str, Any]:
+    statuses = Counter(record["status"] for record in records)
+    outcomes = Counter(record["outcome"] for record in records if record["outcome"])
+    turns = len(records)
+    stage_values: Dict[str, List[int]] = {}
+    for record in records:
+        for stage, value in record["timings_ms"].items():
+            stage_values.setdefault(stage, []).append(value)
+
+    return {
+        "type": "summary",
+        "campaigns": len(campaigns),
+        "turns": turns,
+        "wall_s": round(wall_s, 3),
+        "turns_per_s": round(turns / wall_s, 2) if wall_s else None,
+        "statuses": dict(statuses),
+        "guard_veto_rate": round(statuses["guard_veto"] / turns, 3) if turns else 0.0,
+        "world_veto_rate": round(statuses["world_veto"] / turns, 3) if turns else 0.0,
+        "outcomes": dict(outcomes),
+        "timings_ms": {
+            stage: {
+                "mean": round(statistics.fmean(values), 1),
+                "p50": _percentile(values, 0.5),
+                "p95": _percentile(values, 0.95),
+                "max": max(values),
+            }
+            for stage, values in stage_values.items()
+        },
+        "mean_final_hp": round(statistics.fmean(c["final_hp"] for c in campaigns), 2) if campaigns else None,
+        "mean_final_xp": round(statistics.fmean(c["final_xp"] for c in campaigns), 2) if campaigns else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run many headless campaigns in parallel and report JSONL stats.")
+    parser.add_argument("--campaigns", type=int, default=4, help="Number of independent campaigns (default: 4)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--actions", help="Scripted actions (.txt one per line, or .jsonl); same script per campaign")
+    parser.add_argument(
+        "--policy",
+        choices=["random"],
+        default="random",
+        help="Action generator used when --actions is not given (random: seeded picks from POLICY_ACTIONS)",
+    )
+    parser.add_argument("--turns", type=int, default=20, help="Turns per campaign for the generator policy")
+    parser.add_argument("--seed", type=int, default=0, help="Base seed; campaign i uses seed + i")
+    parser.add_argument("--llm", choices=["stub", "ollama"], default="stub", help="LLM backend (default: stub)")
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        default=engine.LLM_SCHEDULER.max_in_flight,
+        help="Total in-flight Ollama generations per model, shared across workers",
+    )
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Seconds of fake latency per stub call")
+    parser.add_argument("--fused", action="store_true", help="Use fused world + rules adjudication")
+    parser.add_argument("--output", default="-", help="JSONL output path (default: stdout)")
+    parser.add_argument("--work-dir", help="Directory for campaign memory (default: temporary, removed afterwards)")
+    args = parser.parse_args()
+
+    actions = load_actions(Path(args.actions).expanduser()) if args.actions else []
+    work_dir = Path(args.work_dir) if args.work_dir else Path(tempfile.mkdtemp(prefix="gamejee-sim-"))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    workers = max(1, min(args.workers, args.campaigns))
+    if args.llm == "ollama":
+        # Every worker needs at least one slot, so more workers than slots would exceed the total.
+        workers = min(workers, max(1, args.llm_concurrency))
+    llm_in_flight = max(1, args.llm_concurrency // workers)
+    specs = [
+        {
+            "index": index,
+            "seed": args.seed,
+            "work_dir": str(work_dir),
+            "llm": args.llm,
+            "fused": args.fused,
+            "actions": actions,
+            "turns": args.turns,
+        }
+        for index in range(args.campaigns)
+    ]
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    records: List[Dict[str, Any]] = []
+    campaigns: List[Dict[str, Any]] = []
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(llm_in_flight, args.stub_latency),
+        ) as pool:
+            for future in as_completed([pool.submit(run_campaign, spec) for spec in specs]):
+                result = future.result()
+                for record in [*result["records"], result["campaign"]]:
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                records.extend(result["records"])
+                campaigns.append(result["campaign"])
+
+        summary = summarize(records, campaigns, time.perf_counter() - started)
+        out.write(json.dumps(summary, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(
+        f"{summary['campaigns']} campaigns, {summary['turns']} turns in {summary['wall_s']}s "
+        f"({summary['turns_per_s']} turns/s); guard veto {summary['guard_veto_rate']:.1%}, "
+        f"world veto {summary['world_veto_rate']:.1%}",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
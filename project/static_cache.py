@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Tuple
+
+try:  # Optional: brotli is not part of the standard library.
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - depends on local environment
+    brotli = None
+
+# Below this size compression overhead outweighs the saved bytes.
+MIN_COMPRESS_SIZE = 1024
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+
+def accepted_encodings(header: str | None) -> set[str]:
+    """Parse an Accept-Encoding header into the set of codings with a non-zero q-value."""
+    accepted: set[str] = set()
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(token)
+    return accepted
+
+
+def compress_body(raw: bytes, encodings: set[str]) -> Tuple[bytes, str | None]:
+    """Compress a dynamic response body with the best coding the client accepts."""
+    if len(raw) < MIN_COMPRESS_SIZE:
+        return raw, None
+    if brotli is not None and "br" in encodings:
+        return brotli.compress(raw, quality=4), "br"
+    if "gzip" in encodings:
+        return gzip.compress(raw, compresslevel=5), "gzip"
+    return raw, None
+
+
+@dataclass
+class StaticAsset:
+    content_type: str
+    etag: str
+    mtime_ns: int
+    size: int
+    variants: Dict[str, bytes] = field(default_factory=dict)
+
+    def etag_for(self, coding: str | None) -> str:
+        """Strong validators must differ per content-coding, so compressed variants get a suffix."""
+        return self.etag if coding is None else f"{self.etag[:-1]}-{coding}\""
+
+    def pick(self, encodings: set[str]) -> Tuple[bytes, str | None]:
+        for coding in ("br", "gzip"):
+            if coding in encodings and coding in self.variants:
+                return self.variants[coding], coding
+        return self.variants["identity"], None
+
+
+class StaticAssetCache:
+    """In-memory cache of files under a web root, precompressed and invalidated on mtime change."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root.resolve()
+        self._assets: Dict[Path, StaticAsset] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, url_path: str) -> Path | None:
+        """Map a URL path to a file under the web root, refusing traversal outside it."""
+        relative = url_path.split("?", 1)[0].lstrip("/") or "index.html"
+        candidate = (self.root / relative).resolve()
+        if candidate != self.root and self.root not in candidate.parents:
+            return None
+        if candidate.is_dir():
+            candidate = candidate / "index.html"
+        return candidate if candidate.is_file() else None
+
+    def get(self, path: Path) -> StaticAsset:
+        stat = path.stat()
+        with self._lock:
+            cached = self._assets.get(path)
+            if cached and cached.mtime_ns == stat.st_mtime_ns and cached.size == stat.st_size:
+                return cached
+
+        asset = self._build(path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            self._assets[path] = asset
+        return asset
+
+    def _build(self, path: Path, mtime_ns: int, size: int) -> StaticAsset:
+        raw = path.read_bytes()
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type == "application/javascript":
+            content_type = f"{content_type}; charset=utf-8"
+
+        asset = StaticAsset(
+            content_type=content_type,
+            etag=f"\"{hashlib.sha256(raw).hexdigest()[:20]}\"",
+            mtime_ns=mtime_ns,
+            size=size,
+            variants={"identity": raw},
+        )
+        if len(raw) >= MIN_COMPRESS_SIZE and content_type.startswith(COMPRESSIBLE_TYPES):
+            asset.variants["gzip"] = gzip.compress(raw, compresslevel=9)
+            if brotli is not None:
+                asset.variants["br"] = brotli.compress(raw, quality=11)
+        return asset
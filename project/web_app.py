@@ -1,16 +1,39 @@
 from __future__ import annotations
 
+import argparse
+import functools
 import importlib
 import json
+import math
+import os
+import socket
 import sys
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from typing import Callable
+from urllib.parse import parse_qs, urlsplit
 
+from events import EventHub, encode_event
 from import_content import import_content
+from llm_scheduler import SchedulerSaturated
+from prefork import PreforkServer, receive_connections
+from readiness import Readiness
+from static_cache import StaticAssetCache, accepted_encodings, compress_body
 
 HOST = "0.0.0.0"
 PORT = 8000
 PROJECT_ROOT = Path(__file__).resolve().parent
+DEFAULT_SESSION = "default"
+SSE_KEEPALIVE_SECONDS = 15.0
+# Turns run one at a time; beyond this many waiting turns new ones are rejected with 503.
+MAX_PENDING_TURNS = 4
+# Starting guess for one full turn until real turns have been timed.
+INITIAL_TURN_SECONDS = 30.0
+# Warm-up keeps retrying (Ollama often starts after GameJee), backing off up to the maximum delay.
+WARMUP_RETRY_SECONDS = 5.0
+WARMUP_MAX_RETRY_SECONDS = 60.0
 
 
 def build_orchestrator():
@@ -31,17 +54,136 @@ def build_orchestrator():
     return main_module.Orchestrator(PROJECT_ROOT)
 
 
+def start_up(on_fatal: Callable[[], None], readiness: Readiness, workers: int = 1) -> None:
+    """
+    Runs after the socket is bound: build the orchestrator, bootstrap state, then warm every model.
+    A broken main.py stops the server through `on_fatal` (build_orchestrator prints diagnostics).
+    With `workers` processes, each keeps its share of the LLM scheduler limits.
+    """
+    try:
+        orchestrator = build_orchestrator()
+        orchestrator.memory.load()
+    except SystemExit as exc:
+        readiness.mark_orchestrator("failed", error=f"exit code {exc.code}")
+        on_fatal()
+        return
+    except Exception as exc:  # noqa: BLE001 - reported through /readyz and stdout
+        print(f"Startup failed: {exc}")
+        readiness.mark_orchestrator("failed", error=str(exc))
+        on_fatal()
+        return
+
+    if workers > 1:
+        orchestrator.scheduler.split(workers)
+    models = orchestrator.configured_models()
+    readiness.expect_models(models)
+    WebHandler.orchestrator = orchestrator
+    WebHandler.orchestrator_ready.set()
+    readiness.mark_orchestrator("ready")
+    WebHandler.static.get(WebHandler.static.root / "index.html")
+
+    main_module = sys.modules["main"]
+    main_module.MODEL_OK_HOOKS.append(readiness.note_model_ok)
+    for model in models:
+        threading.Thread(target=warm_up, args=(main_module, model, readiness), daemon=True).start()
+
+
+def warm_up(main_module, model: str, readiness: Readiness) -> None:
+    """Retry warming `model` with backoff until it, or a real generation with it, succeeds."""
+    delay = WARMUP_RETRY_SECONDS
+    attempt = 0
+    while not readiness.is_warm(model):
+        attempt += 1
+        readiness.mark_model(model, "warming", attempt=attempt)
+        try:
+            seconds = main_module.warm_model(model)
+        except Exception as exc:  # noqa: BLE001 - Ollama may be down; retried until it is up
+            if readiness.is_warm(model):
+                return
+            readiness.mark_model(model, "failed", attempt=attempt, error=str(exc), retry_in_s=delay)
+            time.sleep(delay)
+            delay = min(delay * 2, WARMUP_MAX_RETRY_SECONDS)
+            continue
+        readiness.mark_model(model, "warm", load_seconds=round(seconds, 2))
+        print(f"Model warm: {model} ({seconds:.1f}s)")
+
+
+class TurnBacklog:
+    """Bounded count of admitted turns plus a running average turn time, for Retry-After."""
+
+    def __init__(self, limit: int, initial_seconds: float = INITIAL_TURN_SECONDS) -> None:
+        self.limit = limit
+        self.avg_seconds = initial_seconds
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def try_admit(self) -> bool:
+        with self._lock:
+            if self.pending >= self.limit:
+                return False
+            self.pending += 1
+            return True
+
+    def done(self, service_seconds: float | None) -> None:
+        """`service_seconds` excludes time queued behind other turns; None when the turn failed."""
+        with self._lock:
+            self.pending -= 1
+            if service_seconds is not None:
+                self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * service_seconds
+
+    def retry_after(self) -> int:
+        """Turns run one at a time, so the backlog drains in about pending × average turn time."""
+        with self._lock:
+            return max(1, math.ceil(self.pending * self.avg_seconds))
+
+
 class WebHandler(BaseHTTPRequestHandler):
-    orchestrator = build_orchestrator()
-    index_path = PROJECT_ROOT / "web" / "index.html"
+    # HTTP/1.1 keeps browser connections alive between requests (Content-Length is always sent).
+    protocol_version = "HTTP/1.1"
+    # Set by start_up() once the server is already accepting connections.
+    orchestrator = None
+    orchestrator_ready = threading.Event()
+    readiness = Readiness()
+    static = StaticAssetCache(PROJECT_ROOT / "web")
+    events = EventHub()
+    turns = TurnBacklog(MAX_PENDING_TURNS)
 
-    def _send_json(self, payload: dict, status: int = 200) -> None:
+    def _send_json(self, payload: dict, status: int = 200, headers: dict | None = None) -> None:
         raw = json.dumps(payload).encode("utf-8")
+        body, coding = compress_body(raw, accepted_encodings(self.headers.get("Accept-Encoding")))
         self.send_response(status)
         self.send_header("Content-Type", "application/json; charset=utf-8")
-        self.send_header("Content-Length", str(len(raw)))
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Vary", "Accept-Encoding")
+        if coding:
+            self.send_header("Content-Encoding", coding)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
-        self.wfile.write(raw)
+        self.wfile.write(body)
+
+    def _require_orchestrator(self):
+        """Return the orchestrator, or answer 503 while startup is still in progress."""
+        if self.orchestrator is None:
+            # A POST body may still be unread; closing keeps it from being parsed as the next request.
+            self._send_json(
+                {"status": "starting", "message": "Le serveur démarre, réessayez dans un instant."},
+                status=503,
+                headers={"Retry-After": "2", "Connection": "close"},
+            )
+        return self.orchestrator
+
+    def _send_busy(self, retry_after: int) -> None:
+        self._send_json(
+            {
+                "status": "busy",
+                "message": f"Le MJ est très sollicité, réessayez dans {retry_after} s.",
+                "retry_after": retry_after,
+            },
+            status=503,
+            headers={"Retry-After": str(retry_after)},
+        )
 
     def _read_json_body(self) -> dict:
         length = int(self.headers.get("Content-Length", "0"))
@@ -52,26 +194,114 @@ class WebHandler(BaseHTTPRequestHandler):
             raise ValueError("Invalid JSON body.") from exc
 
     def do_GET(self) -> None:  # noqa: N802
-        if self.path != "/":
+        url = urlsplit(self.path)
+        if url.path == "/api/events":
+            session = parse_qs(url.query).get("session", [DEFAULT_SESSION])[0] or DEFAULT_SESSION
+            self._stream_events(session)
+            return
+        if url.path == "/api/saves":
+            self._handle_saves({"op": "list"})
+            return
+        if url.path == "/healthz":
+            self._send_json({"status": "ok", "uptime_s": self.readiness.snapshot()["uptime_s"]})
+            return
+        if url.path == "/readyz":
+            snapshot = self.readiness.snapshot()
+            if self.orchestrator is not None:
+                snapshot["llm_backend"] = self.orchestrator.breaker.state
+            self._send_json(snapshot, status=200 if snapshot["ready"] else 503)
+            return
+        self._serve_static(head_only=False)
+
+    def do_HEAD(self) -> None:  # noqa: N802
+        self._serve_static(head_only=True)
+
+    def _serve_static(self, head_only: bool) -> None:
+        path = self.static.resolve(self.path)
+        if path is None:
             self.send_error(404, "Not found")
             return
-        html = self.index_path.read_bytes()
+        asset = self.static.get(path)
+        body, coding = asset.pick(accepted_encodings(self.headers.get("Accept-Encoding")))
+        etag = asset.etag_for(coding)
+
+        if_none_match = self.headers.get("If-None-Match", "")
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+
         self.send_response(200)
-        self.send_header("Content-Type", "text/html; charset=utf-8")
-        self.send_header("Content-Length", str(len(html)))
+        self.send_header("Content-Type", asset.content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        # Revalidate on every load so edits to web/ show up immediately; 304s keep it cheap.
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if coding:
+            self.send_header("Content-Encoding", coding)
         self.end_headers()
-        self.wfile.write(html)
+        if not head_only:
+            self.wfile.write(body)
+
+    def _stream_events(self, session: str) -> None:
+        """
+        Server-Sent Events: a state snapshot, then every event published for the session.
+        Accepted during startup too (EventSource does not retry after a 503); the snapshot waits.
+        """
+        subscriber = self.events.subscribe(session)
+        # The stream has no Content-Length, so it ends by closing the connection.
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.send_header("X-Accel-Buffering", "no")
+        self.end_headers()
+        try:
+            while not self.orchestrator_ready.wait(SSE_KEEPALIVE_SECONDS):
+                self.wfile.write(b": starting\n\n")
+                self.wfile.flush()
+            orchestrator = self.orchestrator
+            state = orchestrator.memory.load()
+            observable = orchestrator.memory.get_observable_context(state)
+            self.wfile.write(encode_event("state_snapshot", {"observable": observable}))
+            self.wfile.flush()
+            while not subscriber.closed:
+                frame = subscriber.next_frame(timeout=SSE_KEEPALIVE_SECONDS)
+                self.wfile.write(frame or b": keep-alive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.events.unsubscribe(session, subscriber)
 
     def do_POST(self) -> None:  # noqa: N802
-        if self.path == "/api/action":
+        path = urlsplit(self.path).path
+        if path == "/api/action":
             self._handle_action()
             return
-        if self.path == "/api/import":
+        if path == "/api/saves":
+            try:
+                data = self._read_json_body()
+            except ValueError as exc:
+                self._send_json({"status": "error", "message": str(exc)}, status=400)
+                return
+            self._handle_saves(data)
+            return
+        if path == "/api/import":
             self._handle_import()
             return
         self.send_error(404, "Not found")
 
     def _handle_action(self) -> None:
+        orchestrator = self._require_orchestrator()
+        if orchestrator is None:
+            return
         try:
             data = self._read_json_body()
         except ValueError as exc:
@@ -80,10 +310,60 @@ class WebHandler(BaseHTTPRequestHandler):
 
         action = str(data.get("action", ""))
         confirm_reset = bool(data.get("confirm_reset", False))
-        result = self.orchestrator.handle_action(action, confirm_reset=confirm_reset)
+        query_session = parse_qs(urlsplit(self.path).query).get("session", [""])[0]
+        session = str(data.get("session", "")).strip() or query_session or DEFAULT_SESSION
+        origin = str(data.get("client_id", ""))
+
+        # elapsed_ms is counted from when the turn got the orchestrator's lock, so it is service time only.
+        service_ms: list[int] = []
+
+        def emit(event: str, payload: dict) -> None:
+            if event == "turn_finished":
+                service_ms.append(payload["elapsed_ms"])
+            self.events.publish(session, event, {**payload, "origin": origin})
+
+        scheduler = orchestrator.scheduler
+        try:
+            scheduler.check_admission("interactive")
+        except SchedulerSaturated as exc:
+            self._send_busy(exc.retry_after)
+            return
+        if not self.turns.try_admit():
+            self._send_busy(max(self.turns.retry_after(), scheduler.retry_after()))
+            return
+        try:
+            result = orchestrator.handle_action(action, confirm_reset=confirm_reset, emit=emit)
+        finally:
+            self.turns.done(service_ms[0] / 1000 if service_ms else None)
+        self._send_json(result)
+
+    def _handle_saves(self, data: dict) -> None:
+        orchestrator = self._require_orchestrator()
+        if orchestrator is None:
+            return
+        op = str(data.get("op", "list")).strip().lower()
+        slot = str(data.get("slot", "")).strip() or None
+        source = str(data.get("source", "")).strip() or None
+        try:
+            result = orchestrator.save_slot_command(op, slot, source)
+        except ValueError as exc:
+            self._send_json({"status": "error", "message": str(exc)}, status=400)
+            return
+
+        if op == "switch":
+            state = orchestrator.memory.load()
+            session = parse_qs(urlsplit(self.path).query).get("session", [""])[0] or DEFAULT_SESSION
+            self.events.publish(
+                session,
+                "state_snapshot",
+                {"observable": orchestrator.memory.get_observable_context(state), "origin": ""},
+            )
         self._send_json(result)
 
     def _handle_import(self) -> None:
+        orchestrator = self._require_orchestrator()
+        if orchestrator is None:
+            return
         try:
             data = self._read_json_body()
         except ValueError as exc:
@@ -106,7 +386,7 @@ class WebHandler(BaseHTTPRequestHandler):
             if not source_path.exists():
                 raise FileNotFoundError(f"Source introuvable: {source_path}")
             # Ensure runtime state exists before import (bootstraps from template when missing).
-            self.orchestrator.memory.load()
+            orchestrator.memory.load()
             cached_path = import_content(PROJECT_ROOT, source_path, content_type, title)
         except Exception as exc:  # noqa: BLE001 - user-facing API needs message
             self._send_json({"status": "error", "message": str(exc)}, status=400)
@@ -121,7 +401,42 @@ class WebHandler(BaseHTTPRequestHandler):
         )
 
 
-if __name__ == "__main__":
-    server = HTTPServer((HOST, PORT), WebHandler)
+def run_worker(channel: socket.socket, workers: int) -> None:
+    """Entry point of one of `workers` pre-forked workers: serve connections handed over by the parent."""
+    # The parent picks a worker per connection, from its first request. Keep-alive would let later
+    # requests for another session ride along to the wrong worker, so answer one request per connection.
+    WebHandler.protocol_version = "HTTP/1.0"
+    # Every worker talks to the same Ollama, so the pending-turn bound is shared out like the scheduler's.
+    WebHandler.turns = TurnBacklog(max(1, MAX_PENDING_TURNS // workers))
+    server = ThreadingHTTPServer((HOST, PORT), WebHandler, bind_and_activate=False)
+    threading.Thread(
+        target=start_up, args=(lambda: os._exit(1), WebHandler.readiness, workers), daemon=True
+    ).start()
+    receive_connections(channel, server.process_request)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the GameJee web UI.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of pre-forked worker processes (default: 1, single process)",
+    )
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        prefork = PreforkServer((HOST, PORT), args.workers, functools.partial(run_worker, workers=args.workers))
+        print(f"Web UI available on http://{HOST}:{PORT} ({args.workers} workers)")
+        sys.exit(prefork.serve_forever())
+
+    server = ThreadingHTTPServer((HOST, PORT), WebHandler)
     print(f"Web UI available on http://{HOST}:{PORT}")
+    threading.Thread(target=start_up, args=(server.shutdown, WebHandler.readiness), daemon=True).start()
     server.serve_forever()
+    if WebHandler.readiness.fatal_error:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()